@@ -33,6 +33,8 @@ for dir_path in [DOWNLOADS_DIR, TEMP_DIR, OUTPUT_DIR, BGM_DIR]:
 DOWNLOAD_SETTINGS = {
     "max_filesize": 500 * 1024 * 1024,  # 500MB max file size to prevent DoS
     "max_duration": 3600,  # 1 hour max duration
+    "max_parallel_downloads": 3,  # Concurrent segment downloads (respect YouTube rate limits)
+    "info_cache_ttl": 1800,  # Reuse resolved stream URLs for 30 min (they expire after ~6h)
 }
 
 # === Video Processing Settings ===
@@ -42,6 +44,35 @@ VIDEO_SETTINGS = {
     "fps": 30,
     "min_clip_duration": 15,  # Minimum duration for a clip
     "max_clip_duration": 300,  # maximum 5 menit (300 detik) untuk narrative arc lengkap
+    # H.264 encoder: "auto" = pakai NVENC/QSV/AMF/VAAPI/VideoToolbox jika tersedia, else libx264.
+    # Bisa juga diisi nama encoder FFmpeg langsung (mis. "libx264", "h264_nvenc").
+    "encoder": os.getenv("VIDEO_ENCODER", "auto"),
+    "vaapi_device": os.getenv("VAAPI_DEVICE", "/dev/dri/renderD128"),
+    # Decode pakai hardware (-hwaccel auto) jika ada.
+    # Dengan NVENC: decode + scale di GPU (CUDA), hanya crop/subtitle di CPU
+    "hw_decode": True,
+    # Maksimal encode NVENC bersamaan (driver GeForce membatasi jumlah sesi per GPU)
+    "nvenc_max_sessions": 2,
+    # libx264 (dipakai jika tidak ada hardware encoder)
+    # Trade-off: "faster" ~2x lebih cepat dari "slow"; CRF 20 (bukan 18) menutup selisih
+    # kualitas yang tidak terlihat di layar HP. "medium"/"slow" = file sedikit lebih kecil,
+    # encode jauh lebih lama. CRF lebih rendah = kualitas lebih tinggi, file lebih besar.
+    "x264_preset": "faster",
+    "x264_crf": 20,
+    "x264_params": "aq-mode=3",  # Adaptive quantization, menjaga detail area gelap/flat
+    # Opsional: -tune libx264 (None = tidak diset). "fastdecode" = encode & playback sedikit
+    # lebih ringan tapi file lebih besar di CRF yang sama; "film"/"animation" sesuai konten.
+    "x264_tune": None,
+    # Lebar thumbnail JPEG (px), tinggi mengikuti rasio. 0 = resolusi penuh (1080x1920)
+    "thumbnail_width": 640,
+}
+
+# === Face Detection Settings (Smart Crop) ===
+FACE_DETECTION_SETTINGS = {
+    # Optional MediaPipe Tasks face detector model (.tflite). When set, detection
+    # runs on the GPU delegate (CPU fallback); otherwise the bundled CPU model is used.
+    "model_path": os.getenv("FACE_DETECTOR_MODEL"),
+    "use_gpu": True,
 }
 
 # === Audio Settings ===
@@ -63,4 +94,7 @@ CAPTION_SETTINGS = {
     "words_per_line": 2,  # 2 kata per subtitle entry (~1 detik interval)
     "style": "animated",  # "simple" (SRT) or "animated" (ASS with word highlight)
     "highlight_color": "&H00FFFF",  # Yellow in ASS hex format (BGR)
+    # True = caption jadi subtitle track (mov_text), tidak di-burn ke video. Jauh lebih
+    # ringan, tapi styling/animasi ASS hilang dan harus didukung player/platform tujuan.
+    "soft_subtitles": False,
 }
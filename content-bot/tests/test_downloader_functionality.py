@@ -16,7 +16,11 @@ sys.modules['numpy'] = MagicMock()
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.downloader import get_video_info
+import asyncio
+import tempfile
+import time
+from utils import downloader
+from utils.downloader import get_video_info, download_video_segment, download_video_segments
 
 class TestDownloaderFunctionality(unittest.TestCase):
 
@@ -52,5 +56,131 @@ class TestDownloaderFunctionality(unittest.TestCase):
         # Verify yt_dlp API was called correctly
         mock_ydl.extract_info.assert_called_once_with(url, download=False)
 
+    @patch('utils.downloader.socket.getaddrinfo')
+    @patch('utils.downloader.yt_dlp.YoutubeDL')
+    def test_segments_reuse_resolved_info(self, mock_ydl_class, mock_getaddrinfo):
+        mock_getaddrinfo.return_value = [(2, 1, 6, '', ('8.8.8.8', 0))]
+        downloader._INFO_CACHE.clear()
+
+        mock_ydl = MagicMock()
+        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl.extract_info.return_value = {"id": "dQw4w9WgXcQ", "formats": []}
+
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        with tempfile.TemporaryDirectory() as tmp:
+            download_video_segment(url, 0, 10, str(Path(tmp) / "segment_1.mp4"))
+            download_video_segment(url, 20, 30, str(Path(tmp) / "segment_2.mp4"))
+
+        # The video page is resolved once; each segment replays a private copy
+        mock_ydl.extract_info.assert_called_once_with(url, download=False, process=False)
+        self.assertEqual(mock_ydl.process_ie_result.call_count, 2)
+        first_info = mock_ydl.process_ie_result.call_args_list[0][0][0]
+        second_info = mock_ydl.process_ie_result.call_args_list[1][0][0]
+        self.assertEqual(first_info, {"id": "dQw4w9WgXcQ", "formats": []})
+        self.assertIsNot(first_info, second_info)
+        downloader._INFO_CACHE.clear()
+
+    @patch('utils.downloader.socket.getaddrinfo')
+    @patch('utils.downloader.yt_dlp.YoutubeDL')
+    def test_failed_replay_resolves_again(self, mock_ydl_class, mock_getaddrinfo):
+        mock_getaddrinfo.return_value = [(2, 1, 6, '', ('8.8.8.8', 0))]
+        downloader._INFO_CACHE.clear()
+
+        mock_ydl = mock_ydl_class.return_value.__enter__.return_value
+        mock_ydl.extract_info.return_value = {"id": "dQw4w9WgXcQ", "formats": []}
+        mock_ydl.process_ie_result.side_effect = [Exception("HTTP Error 403: Forbidden"), None]
+
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        with tempfile.TemporaryDirectory() as tmp:
+            download_video_segment(url, 0, 10, str(Path(tmp) / "segment_1.mp4"))
+
+        # The stale entry is dropped and the retry uses a fresh resolution
+        self.assertEqual(mock_ydl.extract_info.call_count, 2)
+        self.assertEqual(mock_ydl.process_ie_result.call_count, 2)
+        downloader._INFO_CACHE.clear()
+
+    def test_raw_info_expires_and_other_urls_do_not_wait(self):
+        downloader._INFO_CACHE.clear()
+        downloader._INFO_CACHE["https://youtu.be/old"] = (downloader.time.monotonic() - 10**6, {})
+        busy = downloader._INFO_URL_LOCKS.setdefault("https://youtu.be/busy", downloader.threading.Lock())
+        ydl = MagicMock()
+        ydl.extract_info.return_value = {"id": "new"}
+
+        with busy:
+            # Another URL being resolved does not block this one
+            self.assertEqual(downloader._get_raw_info(ydl, "https://youtu.be/new"), {"id": "new"})
+
+        self.assertNotIn("https://youtu.be/old", downloader._INFO_CACHE)
+        downloader._INFO_CACHE.clear()
+        downloader._INFO_URL_LOCKS.clear()
+
+    @patch('utils.downloader.download_video_segment')
+    @patch('utils.downloader.socket.getaddrinfo')
+    def test_download_video_segments_keeps_input_order(self, mock_getaddrinfo, mock_download):
+        mock_getaddrinfo.return_value = [(2, 1, 6, '', ('8.8.8.8', 0))]
+
+        def fake_download(url, start, end, output_path):
+            if start == 20:
+                raise Exception("yt-dlp error: boom")
+            return output_path
+        mock_download.side_effect = fake_download
+
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        results = download_video_segments(url, [(0, 10), (20, 30), (40, 50)], "out")
+
+        self.assertEqual(results, [
+            str(Path("out") / "segment_1.mp4"),
+            None,
+            str(Path("out") / "segment_3.mp4"),
+        ])
+        self.assertEqual(mock_download.call_count, 3)
+
+    @patch('utils.downloader.socket.getaddrinfo')
+    @patch('utils.downloader.yt_dlp.YoutubeDL')
+    def test_get_video_info_cached_by_video_id(self, mock_ydl_class, mock_getaddrinfo):
+        mock_getaddrinfo.return_value = [(2, 1, 6, '', ('8.8.8.8', 0))]
+        mock_ydl = mock_ydl_class.return_value.__enter__.return_value
+        mock_ydl.extract_info.return_value = {"title": "Cached", "duration": 42}
+        downloader._METADATA_CACHE.clear()
+
+        first = get_video_info("https://www.youtube.com/watch?v=abc123XYZ_0")
+        first["title"] = "mutated"
+        second = get_video_info("https://youtu.be/abc123XYZ_0")
+
+        mock_ydl.extract_info.assert_called_once()
+        self.assertEqual(second["title"], "Cached")
+        self.assertEqual(second["duration"], 42)
+        downloader._METADATA_CACHE.clear()
+
+    @patch('utils.downloader.socket.getaddrinfo')
+    @patch('utils.downloader.yt_dlp.YoutubeDL')
+    def test_get_video_info_prunes_expired_entries(self, mock_ydl_class, mock_getaddrinfo):
+        mock_getaddrinfo.return_value = [(2, 1, 6, '', ('8.8.8.8', 0))]
+        mock_ydl = mock_ydl_class.return_value.__enter__.return_value
+        mock_ydl.extract_info.return_value = {"title": "Fresh", "duration": 42}
+        downloader._METADATA_CACHE.clear()
+        ttl = downloader.DOWNLOAD_SETTINGS.get("info_cache_ttl", 1800)
+        downloader._METADATA_CACHE["oldVideo_01"] = ({"title": "Old"}, time.monotonic() - ttl - 1)
+
+        get_video_info("https://www.youtube.com/watch?v=abc123XYZ_0")
+
+        self.assertNotIn("oldVideo_01", downloader._METADATA_CACHE)
+        self.assertIn("abc123XYZ_0", downloader._METADATA_CACHE)
+        downloader._METADATA_CACHE.clear()
+
+    @patch('utils.downloader.download_video_segment')
+    def test_async_segments_run_in_threads(self, mock_download):
+        mock_download.side_effect = lambda url, start, end, path: path
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+        async def run():
+            return await asyncio.gather(
+                downloader.download_video_segment_async(url, 0, 10, "a.mp4"),
+                downloader.download_video_segment_async(url, 20, 30, "b.mp4"),
+            )
+
+        self.assertEqual(asyncio.run(run()), ["a.mp4", "b.mp4"])
+        mock_download.assert_any_call(url, 20, 30, "b.mp4")
+
 if __name__ == '__main__':
     unittest.main()
@@ -50,5 +50,22 @@ class TestDownloaderSSRF(unittest.TestCase):
 
         self.assertIn("Security validation failed: Domain resolves to non-public IP", str(cm.exception))
 
+    @patch('utils.downloader.socket.getaddrinfo')
+    def test_memoized_url_still_checks_dns(self, mock_getaddrinfo):
+        """Only URL parsing is memoized; the resolved IP is re-checked on every call."""
+        from utils.downloader import _validate_youtube_url, _check_domain_resolves_to_public_ip
+        url = "https://youtube.com/watch?v=456"
+
+        _check_domain_resolves_to_public_ip.cache_clear()
+        mock_getaddrinfo.return_value = [(2, 1, 6, '', ('8.8.8.8', 0))]
+        _validate_youtube_url(url)
+
+        _check_domain_resolves_to_public_ip.cache_clear()
+        mock_getaddrinfo.return_value = [(2, 1, 6, '', ('10.0.0.1', 0))]
+        with self.assertRaises(ValueError) as cm:
+            _validate_youtube_url(url)
+
+        self.assertIn("Domain resolves to non-public IP", str(cm.exception))
+
 if __name__ == '__main__':
     unittest.main()
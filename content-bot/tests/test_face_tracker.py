@@ -0,0 +1,204 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+from pathlib import Path
+
+# Mock dependencies before importing face_tracker
+sys.modules['cv2'] = MagicMock()
+sys.modules['mediapipe'] = MagicMock()
+sys.modules['numpy'] = MagicMock()
+sys.modules['dotenv'] = MagicMock()
+sys.modules['requests'] = MagicMock()
+sys.modules['yt_dlp'] = MagicMock()
+sys.modules['yt_dlp.utils'] = MagicMock()
+
+# Add project root to path so we can import modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils import face_tracker
+
+class TestSharedFaceTracker(unittest.TestCase):
+
+    def setUp(self):
+        face_tracker._TRACKER = None
+
+    def tearDown(self):
+        face_tracker._TRACKER = None
+
+    @patch('utils.face_tracker.atexit.register')
+    @patch('utils.face_tracker.FaceTracker')
+    def test_tracker_is_created_once(self, mock_tracker_class, mock_register):
+        """The shared tracker is built lazily once and closed only at exit."""
+        first = face_tracker._get_tracker()
+        second = face_tracker._get_tracker()
+
+        self.assertIs(first, second)
+        mock_tracker_class.assert_called_once()
+        mock_register.assert_called_once_with(first.close)
+
+    @patch('utils.face_tracker.atexit.register')
+    @patch('utils.face_tracker.FaceTracker')
+    def test_smart_crop_options_reuses_tracker(self, mock_tracker_class, mock_register):
+        """smart_crop_options never closes the shared tracker between calls."""
+        tracker = mock_tracker_class.return_value
+        tracker.get_average_face_position.return_value = 0.25
+
+        self.assertEqual(face_tracker.smart_crop_options("a.mp4"), {"center_x": 0.25})
+        self.assertEqual(face_tracker.smart_crop_options("b.mp4"), {"center_x": 0.25})
+
+        mock_tracker_class.assert_called_once()
+        tracker.close.assert_not_called()
+
+class TestTasksBackend(unittest.TestCase):
+
+    @patch.object(face_tracker.FaceTracker, '_create_tasks_detector')
+    def test_tasks_detector_uses_most_confident_face(self, mock_create):
+        """Tasks API boxes are in pixels and must be normalized by frame width."""
+        def detection(score, origin_x, width):
+            d = MagicMock()
+            d.categories[0].score = score
+            d.bounding_box.origin_x = origin_x
+            d.bounding_box.width = width
+            return d
+
+        detector = MagicMock()
+        detector.detect.return_value.detections = [detection(0.6, 100, 50), detection(0.9, 400, 100)]
+        mock_create.return_value = detector
+
+        tracker = face_tracker.FaceTracker(model_asset_path="face.tflite")
+        frame = MagicMock()
+        frame.shape = (180, 1000, 3)
+
+        self.assertAlmostEqual(tracker._detect_center_x(frame), 0.45)
+        self.assertIsNone(tracker.face_detection)
+
+    @patch.object(face_tracker.FaceTracker, '_create_tasks_detector')
+    def test_falls_back_to_solutions_api(self, mock_create):
+        mock_create.return_value = None
+        tracker = face_tracker.FaceTracker(model_asset_path="missing.tflite")
+        self.assertIsNone(tracker.detector)
+        self.assertIsNotNone(tracker.face_detection)
+
+class TestDownscaledPipe(unittest.TestCase):
+
+    def _tracker(self):
+        with patch.object(face_tracker.FaceTracker, '_create_tasks_detector', return_value=None):
+            return face_tracker.FaceTracker()
+
+    @patch('utils.face_tracker.subprocess.Popen')
+    @patch('utils.face_tracker._probe_video_stream', return_value=(1920, 1080, 30.0, 60.0))
+    def test_reads_downscaled_rgb_frames(self, mock_probe, mock_popen):
+        """Frames come from an ffmpeg rawvideo pipe at 320px wide, not OpenCV."""
+        frame_size = 320 * 180 * 3
+        proc = mock_popen.return_value
+        proc.stdout.read.side_effect = [b"\0" * frame_size, b"\0" * frame_size, b""]
+        proc.returncode = 0
+
+        tracker = self._tracker()
+        with patch.object(tracker, '_detect_center_x', side_effect=[0.4, 0.6]), \
+             patch.object(tracker, '_sample_centers_opencv') as mock_opencv:
+            self.assertAlmostEqual(tracker.get_average_face_position("in.mp4"), 0.5)
+            mock_opencv.assert_not_called()
+
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[0], "ffmpeg")
+        self.assertTrue(cmd[cmd.index("-i") + 1].startswith("file:"))
+        # 30fps / interval 10 = 3fps, but 150 samples over 60s caps it at 2.5fps
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "fps=2.500000,scale=320:180")
+        self.assertIn("rawvideo", cmd)
+        proc.stdout.read.assert_called_with(frame_size)
+
+    @patch('utils.face_tracker.subprocess.Popen')
+    @patch('utils.face_tracker._probe_video_stream', return_value=(1920, 1080, 30.0, 60.0))
+    def test_stable_face_skips_next_detection(self, mock_probe, mock_popen):
+        frame_size = 320 * 180 * 3
+        proc = mock_popen.return_value
+        proc.stdout.read.side_effect = [b"\0" * frame_size] * 4 + [b""]
+        proc.returncode = 0
+
+        tracker = self._tracker()
+        with patch.object(tracker, '_detect_center_x', side_effect=[0.40, 0.41, 0.70, 0.72]) as mock_detect, \
+             patch('utils.face_tracker.statistics.median', return_value=0.5) as mock_median:
+            tracker.get_average_face_position("in.mp4")
+        # Third sample is skipped, the fourth is detected again
+        self.assertEqual(mock_detect.call_count, 3)
+        # Only real detections reach the median; the skipped sample adds no extra weight
+        mock_median.assert_called_once_with([0.40, 0.41, 0.70])
+
+    @patch('utils.face_tracker.subprocess.Popen')
+    @patch('utils.face_tracker._probe_video_stream', return_value=(1920, 1080, 30.0, 60.0))
+    def test_max_samples_spreads_fewer_frames(self, mock_probe, mock_popen):
+        mock_popen.return_value.stdout.read.return_value = b""
+        mock_popen.return_value.returncode = 0
+        tracker = self._tracker()
+        tracker.get_average_face_position("in.mp4", max_samples=30)
+
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "fps=0.500000,scale=320:180")
+
+    @patch('utils.face_tracker.subprocess.Popen')
+    @patch('utils.face_tracker._probe_video_stream')
+    def test_caller_stream_info_skips_probe(self, mock_probe, mock_popen):
+        mock_popen.return_value.stdout.read.return_value = b""
+        mock_popen.return_value.returncode = 0
+        tracker = self._tracker()
+        tracker.get_average_face_position("in.mp4", stream_info=(1920, 1080, 30.0, 60.0))
+
+        mock_probe.assert_not_called()
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "fps=2.500000,scale=320:180")
+
+    @patch('utils.face_tracker.subprocess.Popen')
+    @patch('utils.face_tracker._probe_video_stream', return_value=(640, 360, 30.0, 10.0))
+    def test_interrupt_stops_decoder(self, mock_probe, mock_popen):
+        """An aborted scan kills ffmpeg and does not leave the reader thread blocked."""
+        proc = mock_popen.return_value
+        proc.stdout.read.return_value = b"\0" * (320 * 180 * 3)
+
+        def kill():
+            # A killed ffmpeg closes its end of the pipe
+            proc.stdout.read.return_value = b""
+        proc.kill.side_effect = kill
+
+        tracker = self._tracker()
+        with patch.object(tracker, '_detect_center_x', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                tracker.get_average_face_position("in.mp4")
+
+        proc.kill.assert_called()
+        proc.stdout.close.assert_called_once()
+
+    def test_median_ignores_outlier_detections(self):
+        tracker = self._tracker()
+        with patch.object(tracker, '_sample_centers_ffmpeg', return_value=[0.30, 0.32, 0.31, 0.95]):
+            self.assertAlmostEqual(tracker.get_average_face_position("in.mp4"), 0.315)
+
+    @patch('utils.face_tracker.subprocess.Popen')
+    @patch('utils.face_tracker._probe_video_stream', return_value=None)
+    def test_falls_back_to_opencv_when_probe_fails(self, mock_probe, mock_popen):
+        tracker = self._tracker()
+        with patch.object(tracker, '_sample_centers_opencv', return_value=[0.2]) as mock_opencv:
+            self.assertAlmostEqual(tracker.get_average_face_position("in.mp4"), 0.2)
+            mock_opencv.assert_called_once_with("in.mp4", 10, face_tracker.FACE_DETECT_MAX_SAMPLES)
+        mock_popen.assert_not_called()
+
+    @patch('utils.face_tracker.cv2')
+    @patch('utils.face_tracker._open_capture')
+    def test_opencv_fallback_downscales_frames(self, mock_open_capture, mock_cv2):
+        cap = mock_open_capture.return_value
+        cap.isOpened.return_value = True
+        cap.get.return_value = 0
+        cap.grab.side_effect = [True, False]
+        frame = MagicMock()
+        frame.shape = (1080, 1920, 3)
+        cap.retrieve.return_value = (True, frame)
+
+        tracker = self._tracker()
+        with patch.object(tracker, '_detect_center_x', return_value=0.5):
+            self.assertEqual(tracker._sample_centers_opencv("in.mp4", 10, 150), [0.5])
+
+        self.assertEqual(mock_cv2.resize.call_args[0][1], (320, 180))
+        mock_cv2.cvtColor.assert_called_once_with(mock_cv2.resize.return_value, mock_cv2.COLOR_BGR2RGB)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import os
+import json
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import sys
@@ -78,18 +79,58 @@ class TestProcessorOptimization(unittest.TestCase):
         self.assertIn("crop=", filter_str)
         self.assertIn("subtitles=", filter_str)
         self.assertIn("amix=", filter_str)
+        self.assertIn(":normalize=0", filter_str)
+        self.assertNotIn("aloop", filter_str)
+        self.assertEqual(cmd[input_indices[1]-2:input_indices[1]], ["-stream_loop", "-1"])
+        self.assertEqual(cmd[cmd.index("-movflags") + 1], "+faststart")
 
         # Check mapping
         self.assertIn("-map", cmd)
         self.assertIn("[vout]", cmd)
         self.assertIn("[aout]", cmd)
 
+    @patch('subprocess.run')
+    def test_soft_subtitles_are_muxed_not_burned(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        probe = processor.VideoProbe(12.5, 1920, 1080, 30.0, (("video", "h264"), ("audio", "aac")))
+        with patch.dict(processor.CAPTION_SETTINGS, {"soft_subtitles": True}), \
+             patch.object(processor, '_probe_video', return_value=probe), \
+             patch.object(processor, '_detect_hw_encoder', return_value=None), \
+             patch.object(processor, '_run_ffmpeg', return_value=mock_run.return_value) as mock_ffmpeg:
+            processor._create_final_clip_optimized(
+                "segment.mp4", {}, Path("subs.ass"), "bgm.mp3", Path("output.mp4"),
+                precomputed_crop_x="(in_w-out_w)/2"
+            )
+
+        cmd = mock_ffmpeg.call_args[0][0]
+        self.assertNotIn("subtitles=", cmd[cmd.index("-filter_complex") + 1])
+        input_indices = [i for i, x in enumerate(cmd) if x == "-i"]
+        self.assertEqual(cmd[input_indices[2] + 1], f"file:{os.path.abspath('subs.ass')}")
+        self.assertEqual(cmd[cmd.index("-map", cmd.index("[aout]")) + 1], "2:s")
+        self.assertEqual(cmd[cmd.index("-c:s") + 1], "mov_text")
+        # The subtitle track must not end the output at its last cue
+        self.assertNotIn("-shortest", cmd)
+        self.assertEqual(cmd[cmd.index("-t") + 1], "12.500")
+
+    @patch('subprocess.run')
+    def test_soft_subtitles_burn_in_when_length_unknown(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.dict(processor.CAPTION_SETTINGS, {"soft_subtitles": True}), \
+             patch.object(processor, '_probe_video', return_value=None):
+            processor._create_final_clip_optimized(
+                "segment.mp4", {}, Path("subs.ass"), None, Path("output.mp4")
+            )
+
+        cmd = mock_run.call_args[0][0]
+        self.assertIn("subtitles=", cmd[cmd.index("-filter_complex") + 1])
+        self.assertNotIn("-c:s", cmd)
+        self.assertIn("-shortest", cmd)
+
     def test_create_final_clip_calls_optimized(self):
         """
         Verify that create_final_clip calls the optimized pipeline first.
         """
         with patch.object(processor, '_create_final_clip_optimized') as mock_opt, \
-             patch.object(processor, '_create_final_clip_sequential') as mock_seq, \
              patch.object(processor, 'generate_srt_from_segments') as mock_srt, \
              patch.object(processor, 'select_bgm_by_mood') as mock_bgm, \
              patch.object(processor, 'generate_thumbnail') as mock_thumb, \
@@ -107,14 +148,70 @@ class TestProcessorOptimization(unittest.TestCase):
             )
 
             mock_opt.assert_called_once()
-            mock_seq.assert_not_called()
+
+    def test_create_final_clip_prefetches_crop_position(self):
+        with patch.object(processor, '_create_final_clip_optimized') as mock_opt, \
+             patch.object(processor, '_get_smart_crop_x', return_value="(in_w*0.3)-(out_w/2)") as mock_crop, \
+             patch.object(processor, 'select_bgm_by_mood', return_value=None), \
+             patch.object(processor, 'generate_thumbnail'), \
+             patch('builtins.open', new_callable=mock_open):
+            processor.create_final_clip("segment.mp4", {}, [], 1, "output_dir")
+
+        mock_crop.assert_called_once_with("segment.mp4")
+        self.assertEqual(mock_opt.call_args.kwargs["precomputed_crop_x"], "(in_w*0.3)-(out_w/2)")
+
+    def test_crop_executor_is_shared_and_lazy(self):
+        with patch.object(processor, '_CROP_EXECUTOR', None):
+            first = processor._get_crop_executor()
+            second = processor._get_crop_executor()
+            first.shutdown()
+
+        self.assertIs(first, second)
+        self.assertIsNotNone(first)
+
+    def test_create_final_clip_cancels_crop_scan_when_interrupted(self):
+        """An interrupt before the encode cancels the queued Smart Crop scan."""
+        pool = MagicMock()
+        future = pool.submit.return_value
+        with patch.object(processor, '_get_crop_executor', return_value=pool), \
+             patch.object(processor, '_is_output_size', return_value=False), \
+             patch.object(processor, 'select_bgm_by_mood', side_effect=KeyboardInterrupt), \
+             patch.object(processor, '_create_final_clip_optimized') as mock_encode:
+            with self.assertRaises(KeyboardInterrupt):
+                processor.create_final_clip("segment.mp4", {"mood": "funny"}, [], 1, "output_dir")
+
+        future.cancel.assert_called_once()
+        future.result.assert_not_called()
+        mock_encode.assert_not_called()
+
+    def test_caption_file_contents(self):
+        with patch.object(processor, '_create_final_clip_optimized'), \
+             patch.object(processor, 'select_bgm_by_mood', return_value=None), \
+             patch.object(processor, 'generate_thumbnail'), \
+             patch('builtins.open', new_callable=mock_open) as mock_file:
+            result = processor.create_final_clip(
+                "segment.mp4",
+                {"caption_title": "Title", "hook": "Wait for it", "reason": "Funny", "mood": "funny"},
+                [],
+                1,
+                "output_dir"
+            )
+
+        expected = (
+            "Title\n\n--- METADATA ---\n"
+            "🪝 Hook: Wait for it\n"
+            "📖 Funny\n"
+            "🎬 Type: story | Mood: funny\n"
+        )
+        self.assertEqual(result["caption_text"], expected)
+        self.assertFalse(result["captions_burned"])  # no segments, no captions
+        mock_file().write.assert_called_once_with(expected.encode("utf-8"))
 
     def test_create_final_clip_fallback(self):
         """
-        Verify that create_final_clip falls back to sequential if optimized fails.
+        Verify that create_final_clip retries the single pass with simple subtitles.
         """
         with patch.object(processor, '_create_final_clip_optimized') as mock_opt, \
-             patch.object(processor, '_create_final_clip_sequential') as mock_seq, \
              patch.object(processor, 'generate_srt_from_segments') as mock_srt, \
              patch.object(processor, 'select_bgm_by_mood') as mock_bgm, \
              patch.object(processor, 'generate_thumbnail') as mock_thumb, \
@@ -122,7 +219,7 @@ class TestProcessorOptimization(unittest.TestCase):
              patch('builtins.open', new_callable=mock_open) as mock_file:
 
             mock_bgm.return_value = "bgm.mp3"
-            mock_opt.side_effect = Exception("FFmpeg failed")
+            mock_opt.side_effect = [Exception("FFmpeg failed"), "output_dir/01_clip_1.mp4"]
 
             processor.create_final_clip(
                 "segment.mp4",
@@ -132,8 +229,529 @@ class TestProcessorOptimization(unittest.TestCase):
                 "output_dir"
             )
 
-            mock_opt.assert_called_once()
-            mock_seq.assert_called_once()
+            self.assertEqual(mock_opt.call_count, 2)
+            self.assertFalse(mock_opt.call_args_list[0].kwargs.get("simple_subtitles", False))
+            self.assertTrue(mock_opt.call_args_list[1].kwargs["simple_subtitles"])
+            self.assertFalse(mock_opt.call_args_list[1].kwargs["hw_decode"])
+
+    def test_thumbnail_uses_clip_length_from_clip_info(self):
+        with patch.object(processor, '_create_final_clip_optimized'), \
+             patch.object(processor, 'select_bgm_by_mood', return_value=None), \
+             patch.object(processor, 'generate_thumbnail') as mock_thumb, \
+             patch.object(processor, '_get_video_duration') as mock_duration, \
+             patch('builtins.open', new_callable=mock_open):
+            processor.create_final_clip("segment.mp4", {"start": 10.0, "end": 40.0}, [], 1, "output_dir")
+
+        self.assertEqual(mock_thumb.call_args.kwargs["timestamp"], 10.0)
+        mock_duration.assert_not_called()
+
+    def test_create_final_clip_drops_captions_as_last_resort(self):
+        with patch.object(processor, '_create_final_clip_optimized') as mock_opt, \
+             patch.object(processor, 'generate_srt_from_segments'), \
+             patch.object(processor, 'select_bgm_by_mood', return_value=None), \
+             patch.object(processor, 'generate_thumbnail'), \
+             patch('builtins.open', new_callable=mock_open):
+            mock_opt.side_effect = [
+                Exception("FFmpeg error: [Parsed_subtitles_1] Unable to open font"),
+                Exception("FFmpeg error: Error initializing filter 'subtitles'"),
+                "out.mp4",
+            ]
+
+            result = processor.create_final_clip(
+                "segment.mp4", {}, [{"start": 0, "end": 1, "text": "hi"}], 1, "output_dir"
+            )
+
+        self.assertEqual(mock_opt.call_count, 3)
+        self.assertIsNotNone(mock_opt.call_args_list[1][0][2])
+        self.assertIsNone(mock_opt.call_args_list[2][0][2])
+        self.assertFalse(result["captions_burned"])
+
+    def test_create_final_clip_keeps_captions_on_encoder_failure(self):
+        with patch.object(processor, '_create_final_clip_optimized') as mock_opt, \
+             patch.object(processor, 'generate_srt_from_segments'), \
+             patch.object(processor, 'select_bgm_by_mood', return_value=None), \
+             patch.object(processor, 'generate_thumbnail'), \
+             patch('builtins.open', new_callable=mock_open):
+            mock_opt.side_effect = Exception("FFmpeg error: No space left on device")
+
+            with self.assertRaises(Exception):
+                processor.create_final_clip(
+                    "segment.mp4", {}, [{"start": 0, "end": 1, "text": "hi"}], 1, "output_dir"
+                )
+
+        # No third, caption-less encode for a failure unrelated to subtitles
+        self.assertEqual(mock_opt.call_count, 2)
+
+    @patch('os.cpu_count', return_value=8)
+    def test_create_final_clips_budgets_threads(self, mock_cpu):
+        def fake_create(video_segment_path, clip_info, segments, clip_number, output_dir=None,
+                        threads=None, precomputed_crop_x=None):
+            if clip_number == 2:
+                raise Exception("FFmpeg failed")
+            return {"video": video_segment_path, "threads": threads, "crop_x": precomputed_crop_x}
+
+        jobs = [
+            {"video_segment_path": f"seg_{n}.mp4", "clip_info": {}, "segments": [], "clip_number": n}
+            for n in (1, 2, 3)
+        ]
+        with patch.object(processor, 'create_final_clip', side_effect=fake_create), \
+             patch.object(processor, '_get_smart_crop_x', side_effect=lambda p: f"x_{p}") as mock_crop:
+            results = processor.create_final_clips(jobs, max_workers=2)
+
+        self.assertEqual(results, [
+            {"video": "seg_1.mp4", "threads": 4, "crop_x": "x_seg_1.mp4"},
+            None,
+            {"video": "seg_3.mp4", "threads": 4, "crop_x": "x_seg_3.mp4"},
+        ])
+        # Crop analysis is prefetched once per clip, in job order
+        self.assertEqual([c.args[0] for c in mock_crop.call_args_list],
+                         ["seg_1.mp4", "seg_2.mp4", "seg_3.mp4"])
+
+    def test_create_final_clips_cancels_queue_on_interrupt(self):
+        started = []
+
+        def fake_create(video_segment_path, clip_info, segments, clip_number, output_dir=None,
+                        threads=None, precomputed_crop_x=None):
+            started.append(clip_number)
+            if clip_number == 1:
+                raise KeyboardInterrupt
+            return {"video": video_segment_path}
+
+        jobs = [
+            {"video_segment_path": f"seg_{n}.mp4", "clip_info": {}, "segments": [],
+             "clip_number": n, "precomputed_crop_x": "0"}
+            for n in range(1, 6)
+        ]
+        with patch.object(processor, 'create_final_clip', side_effect=fake_create):
+            with self.assertRaises(KeyboardInterrupt):
+                processor.create_final_clips(jobs, max_workers=1)
+
+        self.assertLess(len(started), len(jobs))
+
+    @patch('subprocess.run')
+    def test_threads_flag_passed_to_ffmpeg(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(processor, '_detect_hw_encoder', return_value=None), \
+             patch.object(processor, 'FACE_TRACKER_AVAILABLE', False):
+            processor._create_final_clip_optimized(
+                "segment.mp4", {}, None, None, Path("out.mp4"), threads=3
+            )
+        cmd = mock_run.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-threads") + 1], "3")
+
+    @patch('subprocess.run')
+    def test_thumbnail_written_by_the_same_pass(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(processor, '_detect_hw_encoder', return_value=None), \
+             patch.object(processor, '_get_crop_filter', return_value="crop=1080:1920:0:0"):
+            processor._create_final_clip_optimized(
+                "segment.mp4", {}, None, None, Path("out.mp4"),
+                thumbnail_path=Path("thumb.jpg"), thumbnail_time=10.0
+            )
+
+        cmd = mock_run.call_args[0][0]
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        self.assertEqual(
+            graph,
+            "[0:v]crop=1080:1920:0:0,split=2[vmain][vthumb_src];"
+            "[vthumb_src]select='gte(t,10.000)',scale='min(640,iw)':-2[vthumb];[vmain]null[vout]"
+        )
+        self.assertEqual(cmd[-7:], ["-map", "[vthumb]", "-frames:v", "1", "-q:v", "2",
+                                    f"file:{os.path.abspath('thumb.jpg')}"])
+
+class TestRunFfmpeg(unittest.TestCase):
+
+    @patch('subprocess.run')
+    def test_quiet_flags_and_error_decoding(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=1, stderr=b"x" * 600 + "é".encode("utf-8"))
+        with patch.object(processor, '_detect_hw_encoder', return_value=None):
+            with self.assertRaises(Exception) as cm:
+                processor.add_background_music("in.mp4", "bgm.mp3", "out.mp4")
+
+        cmd = mock_run.call_args[0][0]
+        kwargs = mock_run.call_args[1]
+        self.assertEqual(cmd[:6], ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-nostats"])
+        self.assertIs(kwargs["stdout"], processor.subprocess.DEVNULL)
+        self.assertNotIn("text", kwargs)
+        self.assertTrue(str(cm.exception).endswith("xé"))
+
+    @patch('subprocess.Popen')
+    def test_progress_is_streamed_when_duration_known(self, mock_popen):
+        proc = mock_popen.return_value
+        proc.stdout = MagicMock()
+        proc.stdout.__iter__.return_value = iter([b"frame=10\n", b"out_time_us=5000000\n", b"progress=end\n"])
+        proc.stderr = MagicMock()
+        proc.stderr.__iter__.return_value = iter([b"line %d\n" % i for i in range(300)])
+        proc.returncode = 1
+
+        with patch.object(processor, '_PROGRESS_INTERVAL', 0), \
+             patch('builtins.print') as mock_print:
+            result = processor._run_ffmpeg(["ffmpeg", "-i", "in.mp4", "file:/tmp/out.mp4"], duration=10)
+
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-progress") + 1], "pipe:1")
+        mock_print.assert_any_call("[ENCODE] out.mp4 50%")
+        self.assertEqual(result.returncode, 1)
+        # Only the stderr tail is kept
+        self.assertTrue(result.stderr.startswith(b"line 100\n"))
+        self.assertTrue(result.stderr.endswith(b"line 299\n"))
+
+    def test_standalone_encodes_report_progress(self):
+        probe = processor.VideoProbe(42.0, 1920, 1080, 30.0, (("video", "h264"), ("audio", "aac")))
+        ok = MagicMock(returncode=0)
+        with patch.object(processor, '_probe_video', return_value=probe), \
+             patch.object(processor, '_detect_hw_encoder', return_value=None), \
+             patch.object(processor, '_get_smart_crop_x', return_value="(in_w-out_w)/2"), \
+             patch.object(processor, '_run_ffmpeg', return_value=ok) as mock_run:
+            processor.convert_to_vertical("in.mp4", "v.mp4")
+            processor.burn_captions("in.mp4", "subs.srt", "s.mp4")
+            processor.add_background_music("in.mp4", "bgm.mp3", "m.mp4")
+
+        self.assertEqual(mock_run.call_count, 3)
+        for call in mock_run.call_args_list:
+            self.assertEqual(call.kwargs["duration"], 42.0)
+
+    @patch('subprocess.run')
+    def test_thumbnail_uses_fast_seek(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        processor.generate_thumbnail("clip.mp4", "thumb.jpg", timestamp=5.0)
+
+        cmd = mock_run.call_args[0][0]
+        self.assertLess(cmd.index("-noaccurate_seek"), cmd.index("-i"))
+        self.assertLess(cmd.index("-skip_frame"), cmd.index("-i"))
+        self.assertIn("-an", cmd)
+        self.assertIn("-sn", cmd)
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "scale='min(640,iw)':-2")
+
+    @patch('subprocess.run')
+    def test_thumbnail_retries_without_keyframe_only_decode(self, mock_run):
+        mock_run.side_effect = [MagicMock(returncode=1, stderr=b"no frame"), MagicMock(returncode=0)]
+        processor.generate_thumbnail("clip.mp4", "thumb.jpg", timestamp=5.0)
+
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertNotIn("-skip_frame", mock_run.call_args[0][0])
+
+    @patch('subprocess.run')
+    def test_nvenc_encodes_take_a_session_slot(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        slots = MagicMock()
+        with patch.object(processor, '_NVENC_SESSIONS', slots):
+            processor._run_ffmpeg(["ffmpeg", "-i", "in.mp4", "-c:v", "libx264", "out.mp4"])
+            slots.__enter__.assert_not_called()
+            processor._run_ffmpeg(["ffmpeg", "-i", "in.mp4", "-c:v", "h264_nvenc", "out.mp4"])
+            slots.__enter__.assert_called_once()
+            slots.__exit__.assert_called_once()
+
+class TestStreamProbe(unittest.TestCase):
+
+    def setUp(self):
+        processor._probe_video_for.cache_clear()
+
+    @patch('os.stat')
+    @patch('subprocess.run')
+    def test_audio_less_segment_uses_bgm_only(self, mock_run, mock_stat):
+        mock_stat.return_value = MagicMock(st_mtime_ns=1)
+        probe = MagicMock(returncode=0, stdout=b'{"streams": [{"codec_type": "video", "codec_name": "h264"}]}')
+        encode = MagicMock(returncode=0)
+        mock_run.side_effect = [probe, encode, encode]
+
+        with patch.object(processor, '_detect_hw_encoder', return_value=None), \
+             patch.object(processor, '_get_crop_filter', return_value="crop=1080:1920:0:0"):
+            processor._create_final_clip_optimized("segment.mp4", {}, None, "bgm.mp3", Path("out.mp4"))
+            graph = mock_run.call_args[0][0][mock_run.call_args[0][0].index("-filter_complex") + 1]
+            # Second clip of the same file reuses the cached probe
+            processor._create_final_clip_optimized("segment.mp4", {}, None, "bgm.mp3", Path("out.mp4"))
+
+        self.assertNotIn("amix", graph)
+        self.assertIn("[1:a]volume=0.1[aout]", graph)
+        self.assertEqual(mock_run.call_count, 3)
+
+    @patch('subprocess.run')
+    def test_no_bgm_maps_optional_audio(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(processor, '_detect_hw_encoder', return_value=None), \
+             patch.object(processor, '_get_crop_filter', return_value="crop=1080:1920:0:0"):
+            processor._create_final_clip_optimized("segment.mp4", {}, None, None, Path("out.mp4"))
+        self.assertIn("0:a?", mock_run.call_args[0][0])
+        cmd = mock_run.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-c:a") + 1], "copy")
+
+    def test_audio_is_copied_only_when_mp4_compatible(self):
+        def probe(streams):
+            return processor.VideoProbe(10.0, 1920, 1080, 30.0, streams)
+
+        with patch.object(processor, '_probe_video', return_value=probe((("video", "h264"), ("audio", "aac")))):
+            self.assertEqual(processor._audio_codec_args("a.mp4"), ["-c:a", "copy"])
+        with patch.object(processor, '_probe_video', return_value=probe((("video", "vp9"), ("audio", "opus")))):
+            self.assertEqual(processor._audio_codec_args("a.webm"), ["-c:a", "aac", "-b:a", "128k"])
+        with patch.object(processor, '_probe_video', return_value=None):
+            self.assertEqual(processor._audio_codec_args("missing.mp4"), ["-c:a", "copy"])
+
+class TestVideoDuration(unittest.TestCase):
+
+    def setUp(self):
+        processor._probe_video_for.cache_clear()
+
+    @patch('os.stat')
+    @patch('subprocess.run')
+    def test_duration_cached_per_file_version(self, mock_run, mock_stat):
+        mock_run.return_value = MagicMock(returncode=0, stdout=b'{"format": {"duration": "12.5"}}')
+        mock_stat.return_value = MagicMock(st_mtime_ns=1, st_size=100)
+
+        self.assertEqual(processor._get_video_duration("clip.mp4"), 12.5)
+        self.assertEqual(processor._get_video_duration("clip.mp4"), 12.5)
+        self.assertEqual(mock_run.call_count, 1)
+
+        # File rewritten -> probed again
+        mock_stat.return_value = MagicMock(st_mtime_ns=2, st_size=100)
+        processor._get_video_duration("clip.mp4")
+        self.assertEqual(mock_run.call_count, 2)
+
+        # Same mtime but different size (coarse mtime resolution) -> probed again
+        mock_stat.return_value = MagicMock(st_mtime_ns=2, st_size=200)
+        processor._get_video_duration("clip.mp4")
+        self.assertEqual(mock_run.call_count, 3)
+
+    @patch('os.stat')
+    @patch('subprocess.run')
+    def test_failed_probe_is_not_cached(self, mock_run, mock_stat):
+        mock_stat.return_value = MagicMock(st_mtime_ns=1)
+        mock_run.return_value = MagicMock(returncode=1, stdout=b"")
+        self.assertEqual(processor._get_video_duration("clip.mp4"), 30.0)
+
+        mock_run.return_value = MagicMock(returncode=0, stdout=b'{"format": {"duration": "7.0"}}')
+        self.assertEqual(processor._get_video_duration("clip.mp4"), 7.0)
+
+    @patch('os.stat')
+    @patch('subprocess.run')
+    def test_probe_video_reads_everything_in_one_call(self, mock_run, mock_stat):
+        mock_stat.return_value = MagicMock(st_mtime_ns=1, st_size=100)
+        mock_run.return_value = MagicMock(returncode=0, stdout=json.dumps({
+            "format": {"duration": "61.5"},
+            "streams": [
+                {"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+                 "avg_frame_rate": "30000/1001"},
+                {"codec_type": "audio", "codec_name": "aac", "avg_frame_rate": "0/0"},
+            ],
+        }).encode())
+
+        probe = processor._probe_video("clip.mp4")
+        self.assertEqual((probe.duration, probe.width, probe.height), (61.5, 1920, 1080))
+        self.assertAlmostEqual(probe.fps, 29.97, places=2)
+        self.assertTrue(processor._has_audio_stream("clip.mp4"))
+        self.assertEqual(processor._get_video_duration("clip.mp4"), 61.5)
+        mock_run.assert_called_once()
+
+class TestSmartCropCache(unittest.TestCase):
+
+    def setUp(self):
+        processor._smart_crop_x_for.cache_clear()
+
+    def tearDown(self):
+        processor._smart_crop_x_for.cache_clear()
+
+    @patch('os.stat')
+    def test_face_detection_runs_once_per_file_version(self, mock_stat):
+        mock_stat.return_value = MagicMock(st_mtime_ns=1)
+        probe = processor.VideoProbe(60.0, 1920, 1080, 30.0, (("video", "h264"),))
+        with patch.object(processor, 'FACE_TRACKER_AVAILABLE', True), \
+             patch.object(processor, '_probe_video', return_value=probe), \
+             patch.object(processor, '_get_face_tracker', create=True) as mock_get_tracker:
+            tracker = mock_get_tracker.return_value
+            tracker.get_average_face_position.return_value = 0.25
+            first = processor._get_crop_filter("segment.mp4")
+            second = processor._get_crop_filter("segment.mp4")
+
+        self.assertEqual(first, second)
+        self.assertIn("crop=1080:1920:(in_w*0.25)-(out_w/2):0", first)
+        # The cached probe is handed over so the tracker skips its own ffprobe
+        tracker.get_average_face_position.assert_called_once_with(
+            os.path.abspath("segment.mp4"), max_samples=processor.SMART_CROP_MAX_SAMPLES,
+            stream_info=(1920, 1080, 30.0, 60.0)
+        )
+        # The shared tracker stays open for the next video
+        tracker.close.assert_not_called()
+
+    def test_precomputed_crop_x_skips_detection(self):
+        with patch.object(processor, '_get_smart_crop_x') as mock_smart:
+            crop = processor._get_crop_filter("segment.mp4", precomputed_crop_x="(in_w*0.7)-(out_w/2)")
+        mock_smart.assert_not_called()
+        self.assertEqual(crop, "scale=-1:1920,crop=1080:1920:(in_w*0.7)-(out_w/2):0")
+
+    @patch('subprocess.run')
+    def test_already_vertical_input_is_not_cropped(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        probe = processor.VideoProbe(30.0, 1080, 1920, 30.0, (("video", "h264"),))
+        with patch.object(processor, '_probe_video', return_value=probe), \
+             patch.object(processor, '_get_smart_crop_x') as mock_smart:
+            self.assertEqual(processor._get_crop_filter("vertical.mp4"), "null")
+            processor.convert_to_vertical("vertical.mp4", "out.mp4")
+        mock_smart.assert_not_called()
+
+        cmd = mock_run.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-c") + 1], "copy")
+        self.assertNotIn("-vf", cmd)
+
+    def test_vertical_inputs_skip_crop_prefetch(self):
+        def fake_create(video_segment_path, clip_info, segments, clip_number, output_dir=None,
+                        threads=None, precomputed_crop_x=None):
+            return {"video": video_segment_path, "crop_x": precomputed_crop_x}
+
+        jobs = [
+            {"video_segment_path": p, "clip_info": {}, "segments": [], "clip_number": n}
+            for n, p in enumerate(["vertical.mp4", "wide.mp4"], 1)
+        ]
+        with patch.object(processor, '_is_output_size', side_effect=lambda p: p == "vertical.mp4"), \
+             patch.object(processor, '_get_smart_crop_x', side_effect=lambda p: f"x_{p}") as mock_crop, \
+             patch.object(processor, 'create_final_clip', side_effect=fake_create):
+            results = processor.create_final_clips(jobs, max_workers=1)
+            positions = processor.precompute_crop_positions(["vertical.mp4", "wide.mp4"])
+
+        self.assertEqual(results[0]["crop_x"], None)
+        self.assertEqual(results[1]["crop_x"], "x_wide.mp4")
+        self.assertEqual(positions, {"wide.mp4": "x_wide.mp4"})
+        self.assertNotIn("vertical.mp4", [c.args[0] for c in mock_crop.call_args_list])
+
+    def test_precompute_crop_positions_dedupes_paths(self):
+        with patch.object(processor, '_get_smart_crop_x', side_effect=lambda p: f"x_{p}") as mock_crop:
+            positions = processor.precompute_crop_positions(["a.mp4", "b.mp4", "a.mp4"])
+
+        self.assertEqual(positions, {"a.mp4": "x_a.mp4", "b.mp4": "x_b.mp4"})
+        self.assertEqual(mock_crop.call_count, 2)
+        self.assertEqual(processor.precompute_crop_positions([]), {})
+
+class TestBgmIndex(unittest.TestCase):
+
+    def setUp(self):
+        processor._BGM_INDEX.clear()
+
+    def test_index_refreshes_when_directory_changes(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as bgm_dir:
+            Path(bgm_dir, "Chill_Lofi.MP3").touch()
+            Path(bgm_dir, "notes.txt").touch()
+            Path(bgm_dir, "chill.mp3").mkdir()
+            with patch.object(processor, 'BGM_DIR', bgm_dir):
+                self.assertEqual(processor.select_bgm_by_mood("chill"),
+                                 str(Path(bgm_dir, "Chill_Lofi.MP3")))
+
+                # Directories named like audio files are skipped
+                self.assertEqual([p.name for p, _ in processor._list_bgm_files(bgm_dir)],
+                                 ["Chill_Lofi.MP3"])
+
+                with patch('os.scandir', wraps=os.scandir) as mock_scandir:
+                    processor.select_bgm_by_mood("chill")
+                    mock_scandir.assert_not_called()
+
+                Path(bgm_dir, "epic_drums.ogg").touch()
+                os.utime(bgm_dir, ns=(0, os.stat(bgm_dir).st_mtime_ns + 10**9))
+                self.assertEqual(processor.select_bgm_by_mood("dramatic"),
+                                 str(Path(bgm_dir, "epic_drums.ogg")))
+        processor._BGM_INDEX.clear()
+
+    def test_mood_matches_are_computed_once(self):
+        index = ((Path("bgm/calm_piano.mp3"), "calm_piano"), (Path("bgm/epic.mp3"), "epic"))
+        with patch.object(processor, '_list_bgm_files', return_value=index):
+            processor._BGM_MOOD_INDEX.clear()
+            self.assertEqual(processor._bgm_for_mood("bgm", "emotional")[1], (Path("bgm/calm_piano.mp3"),))
+            # Cached: the matcher never looks at the stems again
+            with patch.object(processor, 'MOOD_PATTERNS', {}):
+                self.assertEqual(processor._bgm_for_mood("bgm", "emotional")[1],
+                                 (Path("bgm/calm_piano.mp3"),))
+            self.assertEqual(processor._bgm_for_mood("bgm", "unknown")[1], ())
+        processor._BGM_MOOD_INDEX.clear()
+
+class TestHardwareEncoder(unittest.TestCase):
+
+    def setUp(self):
+        processor._detect_hw_encoder.cache_clear()
+
+    def tearDown(self):
+        processor._detect_hw_encoder.cache_clear()
+
+    @patch.object(processor, '_probe_encoder')
+    @patch('subprocess.run')
+    def test_detects_first_working_listed_encoder(self, mock_run, mock_probe):
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stdout=b" V....D h264_nvenc  NVIDIA NVENC\n V....D h264_vaapi  VAAPI\n"
+        )
+        # NVENC is compiled in but there is no NVIDIA GPU
+        mock_probe.side_effect = lambda enc: enc == "h264_vaapi"
+
+        self.assertEqual(processor._detect_hw_encoder(), "h264_vaapi")
+        self.assertEqual(processor._detect_hw_encoder(), "h264_vaapi")
+        mock_run.assert_called_once()
+        self.assertEqual([c.args[0] for c in mock_probe.call_args_list], ["h264_nvenc", "h264_vaapi"])
+
+    @patch.object(processor, '_probe_encoder', return_value=True)
+    @patch('subprocess.run')
+    def test_detects_amf(self, mock_run, mock_probe):
+        mock_run.return_value = MagicMock(returncode=0, stdout=b" V....D h264_amf  AMD AMF H.264 Encoder\n")
+        self.assertEqual(processor._detect_hw_encoder(), "h264_amf")
+        args = processor._video_encode_args("h264_amf")
+        self.assertEqual(args[args.index("-rc") + 1], "cqp")
+
+    @patch('subprocess.run')
+    def test_falls_back_to_libx264(self, mock_run):
+        mock_run.side_effect = FileNotFoundError("ffmpeg")
+        self.assertIsNone(processor._detect_hw_encoder())
+        self.assertEqual(processor._video_encode_args(None), [
+            "-c:v", "libx264", "-crf", "20", "-preset", "faster",
+            "-x264-params", "aq-mode=3:sliced-threads=0", "-pix_fmt", "yuv420p"
+        ])
+
+    def test_x264_tune_is_optional(self):
+        with patch.object(processor, 'X264_TUNE', "fastdecode"):
+            args = processor._video_encode_args(None)
+        self.assertEqual(args[args.index("-tune") + 1], "fastdecode")
+
+    @patch('subprocess.run')
+    def test_vaapi_pipeline_uploads_frames(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(processor, '_detect_hw_encoder', return_value="h264_vaapi"), \
+             patch.object(processor, '_get_crop_filter', return_value="crop=1080:1920:0:0"):
+            processor._create_final_clip_optimized("segment.mp4", {}, None, None, Path("out.mp4"))
+
+        cmd = mock_run.call_args[0][0]
+        self.assertLess(cmd.index("-vaapi_device"), cmd.index("-i"))
+        self.assertIn("format=nv12,hwupload[vout]", cmd[cmd.index("-filter_complex") + 1])
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "h264_vaapi")
+
+    @patch('subprocess.run')
+    def test_software_encode_uses_auto_hw_decode(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(processor, '_detect_hw_encoder', return_value=None), \
+             patch.object(processor, 'FACE_TRACKER_AVAILABLE', False):
+            processor._create_final_clip_optimized("segment.mp4", {}, None, None, Path("out.mp4"))
+
+        cmd = mock_run.call_args[0][0]
+        self.assertEqual(cmd[cmd.index("-hwaccel") + 1], "auto")
+        self.assertLess(cmd.index("-hwaccel"), cmd.index("-i"))
+        self.assertNotIn("-hwaccel_output_format", cmd)
+        self.assertIn("[0:v]scale=-1:1920,crop=", cmd[cmd.index("-filter_complex") + 1])
+
+    @patch('subprocess.run')
+    def test_nvenc_pipeline_keeps_frames_on_gpu(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(processor, '_detect_hw_encoder', return_value="h264_nvenc"), \
+             patch.object(processor, 'FACE_TRACKER_AVAILABLE', False):
+            processor._create_final_clip_optimized(
+                "segment.mp4", {}, Path("subs.srt"), None, Path("out.mp4")
+            )
+            gpu_cmd = mock_run.call_args[0][0]
+            processor._create_final_clip_optimized(
+                "segment.mp4", {}, Path("subs.srt"), None, Path("out.mp4"), hw_decode=False
+            )
+            cpu_cmd = mock_run.call_args[0][0]
+
+        self.assertLess(gpu_cmd.index("-hwaccel_output_format"), gpu_cmd.index("-i"))
+        graph = gpu_cmd[gpu_cmd.index("-filter_complex") + 1]
+        self.assertTrue(graph.startswith("[0:v]scale_cuda=-2:1920,hwdownload,format=nv12,crop="))
+        self.assertLess(graph.index("hwdownload"), graph.index("subtitles="))
+        self.assertNotIn("-hwaccel", cpu_cmd)
+        self.assertEqual(gpu_cmd[gpu_cmd.index("-tune") + 1], "hq")
+        self.assertIn("[0:v]scale=-1:1920,crop=", cpu_cmd[cpu_cmd.index("-filter_complex") + 1])
 
 if __name__ == '__main__':
     unittest.main()
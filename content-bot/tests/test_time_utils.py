@@ -17,7 +17,7 @@ sys.modules['config'] = MagicMock()
 # Add project root to path so we can import modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.time_utils import format_timestamp
+from utils.time_utils import format_timestamp, format_timestamp_batch
 
 class TestTimeUtils(unittest.TestCase):
 
@@ -45,6 +45,16 @@ class TestTimeUtils(unittest.TestCase):
     def test_invalid_format(self):
         with self.assertRaises(ValueError):
             format_timestamp(0, 'invalid')
+        with self.assertRaises(ValueError):
+            format_timestamp_batch([0], 'invalid')
+
+    def test_batch_matches_single(self):
+        values = [0, 0.5, 1.001, 1.999, 59.9996, 61.25, 3599.995, 3661, 7325.4321]
+        for format_type in ('srt', 'ass'):
+            self.assertEqual(
+                format_timestamp_batch(iter(values), format_type),
+                [format_timestamp(v, format_type) for v in values]
+            )
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,7 +2,10 @@
 """
 Auto-Clip Utils Package
 """
-from .downloader import download_audio_only, download_video_segment, get_video_info
+from .downloader import (
+    download_audio_only, download_video_segment, download_video_segments, get_video_info,
+    download_audio_only_async, download_video_segment_async,
+)
 from .ai_logic import (
     transcribe_audio, analyze_content_for_clips, generate_clip_caption,
     translate_segments, validate_dependencies, api_retry
@@ -13,6 +16,8 @@ from .processor import (
     add_background_music,
     generate_thumbnail,
     create_final_clip,
+    create_final_clips,
+    precompute_crop_positions,
     select_bgm_by_mood,
     generate_srt_from_segments,
 )
@@ -21,7 +26,10 @@ __all__ = [
     # Downloader
     "download_audio_only",
     "download_video_segment",
+    "download_video_segments",
     "get_video_info",
+    "download_audio_only_async",
+    "download_video_segment_async",
     # AI
     "transcribe_audio",
     "analyze_content_for_clips",
@@ -35,6 +43,8 @@ __all__ = [
     "add_background_music",
     "generate_thumbnail",
     "create_final_clip",
+    "create_final_clips",
+    "precompute_crop_positions",
     "select_bgm_by_mood",
     "generate_srt_from_segments",
 ]
@@ -37,8 +37,11 @@ def validate_dependencies():
 
     for tool in ["ffmpeg", "ffprobe"]:
         try:
+            # Only the exit code matters; don't buffer the version banner
             result = subprocess.run(
-                [tool, "-version"], capture_output=True, text=True, timeout=10
+                [tool, "-version"],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                timeout=10
             )
             if result.returncode != 0:
                 raise FileNotFoundError
@@ -218,10 +221,12 @@ def _get_audio_duration(audio_path: str) -> float:
         f"file:{os.path.abspath(audio_path)}"
     ]
     
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    result = subprocess.run(
+        cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=60
+    )
     
     try:
-        return float(result.stdout.strip())
+        return float(result.stdout.strip())  # float() parses ASCII bytes directly
     except:
         return 600.0  # Default fallback 10 menit
 
@@ -258,6 +263,7 @@ def _extract_audio_chunk(audio_path: str, output_path: str, start: float, end: f
 
     cmd = [
         "ffmpeg", "-y",
+        "-hide_banner", "-nostdin", "-loglevel", "error",
         "-ss", str(start),
         "-i", f"file:{os.path.abspath(audio_path)}",
         "-t", str(duration),
@@ -265,9 +271,13 @@ def _extract_audio_chunk(audio_path: str, output_path: str, start: float, end: f
         f"file:{os.path.abspath(output_path)}"
     ]
     
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+    # ⚡ Bolt Optimization: Keep stderr as bytes, decode only on failure
+    result = subprocess.run(
+        cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=600
+    )
     if result.returncode != 0:
-        raise Exception(f"FFmpeg error: {result.stderr[-500:] if result.stderr else ''}")
+        stderr = result.stderr.decode("utf-8", "replace") if result.stderr else ""
+        raise Exception(f"FFmpeg error: {stderr[-500:]}")
 
 
 def _transcribe_chunk(audio_path: str, time_offset: float, max_retries: int = 3, chunk_label: str = "", session=None) -> dict:
@@ -5,13 +5,18 @@ Optimized: Download audio dulu untuk transkripsi, video segment kemudian
 """
 import sys
 import os
+import copy
+import asyncio
 import json
+import time
 import socket
 import functools
 import ipaddress
+import threading
+import concurrent.futures
 import yt_dlp
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs
 from yt_dlp.utils import download_range_func, match_filter_func
 
 from config import DOWNLOAD_SETTINGS
@@ -34,21 +39,37 @@ def _check_domain_resolves_to_public_ip(hostname: str):
     except socket.gaierror as e:
         raise ValueError(f"Could not resolve domain {hostname}: {str(e)}")
 
+_ALLOWED_SCHEMES = frozenset({"http", "https"})
+_ALLOWED_DOMAINS = frozenset({"youtube.com", "www.youtube.com", "m.youtube.com", "youtu.be"})
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_youtube_hostname(url: str) -> str:
+    """
+    Check URL length, scheme and domain against the allow-list and return the hostname.
+    Pure function of the URL string, so it is safe to memoize (unlike the DNS check).
+    """
+    if len(url) > 2000:
+        raise ValueError("URL exceeds maximum allowed length of 2000 characters")
+    parsed = urlparse(url)
+    if parsed.scheme not in _ALLOWED_SCHEMES:
+        raise ValueError(f"Invalid URL scheme: {parsed.scheme}")
+
+    hostname = parsed.hostname
+    if hostname is None or hostname.lower() not in _ALLOWED_DOMAINS:
+        raise ValueError(f"Invalid domain: {hostname}")
+    return hostname
+
+
 def _validate_youtube_url(url: str):
     """
     Validate that the URL is a legitimate YouTube URL to prevent SSRF/local file access.
     """
     try:
-        if len(url) > 2000:
-            raise ValueError("URL exceeds maximum allowed length of 2000 characters")
-        parsed = urlparse(url)
-        if parsed.scheme not in ["http", "https"]:
-            raise ValueError(f"Invalid URL scheme: {parsed.scheme}")
-
-        allowed_domains = ["youtube.com", "www.youtube.com", "m.youtube.com", "youtu.be"]
-        hostname = parsed.hostname
-        if hostname is None or hostname.lower() not in allowed_domains:
-            raise ValueError(f"Invalid domain: {hostname}")
+        # ⚡ Bolt Optimization: Memoize the syntactic URL checks
+        # Impact: Every download/info call re-validates the same URL; repeat calls skip
+        # urlparse and the allow-list lookups. Rejections raise, so they are never cached.
+        hostname = _parse_youtube_hostname(url)
 
         # ⚡ Bolt Optimization: Use cached DNS resolution to prevent redundant latency
         # Impact: Eliminates blocking socket calls when downloading multiple segments from the same hostname
@@ -60,6 +81,83 @@ def _validate_youtube_url(url: str):
         raise ValueError(f"Invalid URL format: {str(e)}")
 
 
+# ⚡ Bolt Optimization: Build the shared yt-dlp options once at import
+# Impact: match_filter_func parses its filter expression on every call; the limits come
+# from static config, so every download/info call can reuse one compiled filter.
+_BASE_YDL_OPTS = {
+    'noplaylist': True,
+    'quiet': True,
+    'socket_timeout': 60,  # Prevent hanging connections
+    'max_filesize': DOWNLOAD_SETTINGS['max_filesize'],
+    'match_filter': match_filter_func(f"duration <= {DOWNLOAD_SETTINGS['max_duration']}"),
+}
+
+
+# url -> (monotonic time, raw extractor result); guarded by _INFO_CACHE_LOCK
+_INFO_CACHE = {}
+_INFO_CACHE_LOCK = threading.Lock()
+# url -> lock held while that URL is being resolved (also guarded by _INFO_CACHE_LOCK)
+_INFO_URL_LOCKS = {}
+
+# Process-wide cap on simultaneous segment downloads (YouTube rate limits)
+_MAX_PARALLEL_DOWNLOADS = max(1, int(DOWNLOAD_SETTINGS.get("max_parallel_downloads", 3)))
+_DOWNLOAD_SLOTS = threading.BoundedSemaphore(_MAX_PARALLEL_DOWNLOADS)
+
+
+def _fresh_raw_info(url: str, ttl: float):
+    """Cached (time, info) for url if still fresh, else None. Caller holds _INFO_CACHE_LOCK."""
+    cached = _INFO_CACHE.get(url)
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        return cached
+    return None
+
+
+def _get_raw_info(ydl, url: str) -> dict:
+    """
+    Return the unprocessed extractor result for a URL, reusing a recent one.
+
+    The result still carries every format with its stream URL, so callers can
+    hand a copy to `ydl.process_ie_result` to select formats and download
+    without resolving the video page and player manifests again.
+    """
+    ttl = DOWNLOAD_SETTINGS.get("info_cache_ttl", 1800)
+    with _INFO_CACHE_LOCK:
+        cached = _fresh_raw_info(url, ttl)
+        if cached is None:
+            url_lock = _INFO_URL_LOCKS.setdefault(url, threading.Lock())
+
+    if cached is None:
+        # Only callers of the same URL wait for one resolution; downloads of other
+        # videos keep running while extract_info is on the network.
+        with url_lock:
+            with _INFO_CACHE_LOCK:
+                cached = _fresh_raw_info(url, ttl)
+            if cached is None:
+                info = ydl.extract_info(url, download=False, process=False)
+                cached = (time.monotonic(), info)
+                with _INFO_CACHE_LOCK:
+                    _prune_raw_info(ttl)
+                    _INFO_CACHE[url] = cached
+    # process_ie_result mutates the dict it is given
+    return copy.deepcopy(cached[1])
+
+
+def _prune_raw_info(ttl: float) -> None:
+    """Drop expired extractor results (and idle URL locks). Caller holds _INFO_CACHE_LOCK."""
+    now = time.monotonic()
+    for url in [u for u, (t, _) in _INFO_CACHE.items() if now - t >= ttl]:
+        del _INFO_CACHE[url]
+        url_lock = _INFO_URL_LOCKS.get(url)
+        if url_lock is not None and not url_lock.locked():
+            del _INFO_URL_LOCKS[url]
+
+
+def _evict_raw_info(url: str) -> None:
+    """Forget the cached extractor result for url so the next caller resolves it again."""
+    with _INFO_CACHE_LOCK:
+        _INFO_CACHE.pop(url, None)
+
+
 def download_audio_only(url: str, output_dir: str) -> str:
     """
     Download audio saja dari YouTube (lebih cepat & hemat storage)
@@ -85,11 +183,7 @@ def download_audio_only(url: str, output_dir: str) -> str:
     ydl_opts = {
         'format': 'bestaudio/best',
         'outtmpl': output_template,
-        'noplaylist': True,
-        'quiet': True,
-        'socket_timeout': 60,  # Prevent hanging connections
-        'max_filesize': DOWNLOAD_SETTINGS['max_filesize'],
-        'match_filter': match_filter_func(f"duration <= {DOWNLOAD_SETTINGS['max_duration']}"),
+        **_BASE_YDL_OPTS,
     }
     
     print(f"[DL] Downloading audio from: {url}")
@@ -141,11 +235,7 @@ def download_video_segment(url: str, start: float, end: float, output_path: str)
         'download_ranges': download_range_func(None, [(start, end)]),
         'force_keyframes_at_cuts': True,
         'merge_output_format': 'mp4',
-        'noplaylist': True,
-        'quiet': True,
-        'socket_timeout': 60,  # Prevent hanging connections
-        'max_filesize': DOWNLOAD_SETTINGS['max_filesize'],
-        'match_filter': match_filter_func(f"duration <= {DOWNLOAD_SETTINGS['max_duration']}"),
+        **_BASE_YDL_OPTS,
     }
 
     print(f"[DL] Downloading video segment: {start_str} - {end_str}")
@@ -153,8 +243,22 @@ def download_video_segment(url: str, start: float, end: float, output_path: str)
     try:
         # Optimized: Use direct yt_dlp library call instead of subprocess
         # This avoids process creation overhead and provides better error handling
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        # ⚡ Bolt Optimization: Resolve the video once and replay it for every segment
+        # Impact: Repeat clips from the same video skip the page/player/manifest requests
+        # and go straight to the ranged download of the selected formats.
+        # Measurement: Time downloading 5 segments of one video with vs without the cache.
+        with _DOWNLOAD_SLOTS, yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            try:
+                ydl.process_ie_result(_get_raw_info(ydl, url), download=True)
+            except Exception:
+                # Expired signed stream URLs (403) or a bad extraction must not be
+                # replayed for every later segment: resolve again once, then give up.
+                _evict_raw_info(url)
+                try:
+                    ydl.process_ie_result(_get_raw_info(ydl, url), download=True)
+                except Exception:
+                    _evict_raw_info(url)
+                    raise
 
         print(f"[OK] Video segment downloaded: {output_path}")
         return str(output_path)
@@ -163,6 +267,89 @@ def download_video_segment(url: str, start: float, end: float, output_path: str)
         raise Exception(f"yt-dlp error: {str(e)[:500]}")
 
 
+def download_video_segments(url: str, spans: list, output_dir: str) -> list:
+    """
+    Download beberapa segment dari video yang sama secara paralel
+
+    Args:
+        url: YouTube URL
+        spans: List of (start, end) tuples in seconds
+        output_dir: Directory untuk menyimpan segment (segment_1.mp4, ...)
+
+    Returns:
+        List path segment dengan urutan sama seperti spans
+        (None untuk segment yang gagal didownload)
+    """
+    _validate_youtube_url(url)
+
+    output_dir = Path(output_dir)
+    results = [None] * len(spans)
+    if not spans:
+        return results
+
+    # ⚡ Bolt Optimization: Download independent segments concurrently
+    # Impact: A single ranged download rarely saturates bandwidth, so N clips finish in
+    # ~N/3 of the serial wall time while sharing one resolved video (see _get_raw_info).
+    # Measurement: Time download_video_segments for 6 spans vs 6 serial download_video_segment calls.
+    max_workers = min(len(spans), _MAX_PARALLEL_DOWNLOADS)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_index = {
+            executor.submit(
+                download_video_segment, url, start, end, str(output_dir / f"segment_{i}.mp4")
+            ): i - 1
+            for i, (start, end) in enumerate(spans, 1)
+        }
+        for future in concurrent.futures.as_completed(future_to_index):
+            index = future_to_index[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print(f"! Failed to download segment {index + 1}: {e}")
+
+    return results
+
+
+async def download_audio_only_async(url: str, output_dir: str) -> str:
+    """
+    Versi async dari download_audio_only untuk pipeline berbasis asyncio.
+    yt-dlp tetap blocking, jadi dijalankan di worker thread.
+    """
+    return await asyncio.to_thread(download_audio_only, url, output_dir)
+
+
+async def download_video_segment_async(url: str, start: float, end: float, output_path: str) -> str:
+    """
+    Versi async dari download_video_segment.
+    Concurrency dibatasi oleh _DOWNLOAD_SLOTS yang sama dengan jalur sync,
+    dan segment dari video yang sama tetap berbagi hasil _get_raw_info.
+    """
+    # ⚡ Bolt Optimization: Run blocking yt-dlp calls off the event loop
+    # Impact: Async callers can gather many segments without blocking the loop; the shared
+    # process-wide download slots still cap simultaneous connections to googlevideo.
+    return await asyncio.to_thread(download_video_segment, url, start, end, output_path)
+
+
+_METADATA_CACHE = {}
+_METADATA_CACHE_LOCK = threading.Lock()
+
+
+def _prune_metadata(ttl: float) -> None:
+    """Drop expired get_video_info entries. Caller holds _METADATA_CACHE_LOCK."""
+    now = time.monotonic()
+    for key in [k for k, (_, t) in _METADATA_CACHE.items() if now - t >= ttl]:
+        del _METADATA_CACHE[key]
+
+
+def _youtube_video_id(url: str):
+    """Extract the video ID from a YouTube URL, or None if not recognizable."""
+    parsed = urlparse(url)
+    if (parsed.hostname or "").lower() == "youtu.be":
+        return parsed.path.lstrip("/").split("/")[0] or None
+    if parsed.path.startswith(("/shorts/", "/live/", "/embed/")):
+        return parsed.path.split("/")[2] or None
+    return parse_qs(parsed.query).get("v", [None])[0]
+
+
 def get_video_info(url: str) -> dict:
     """
     Get video metadata (title, duration, etc.)
@@ -180,18 +367,25 @@ def get_video_info(url: str) -> dict:
     ydl_opts = {
         'dump_single_json': True,
         'extract_flat': 'in_playlist',
-        'noplaylist': True,
-        'quiet': True,
-        'socket_timeout': 60,  # Prevent hanging connections
-        'max_filesize': DOWNLOAD_SETTINGS['max_filesize'],
-        'match_filter': match_filter_func(f"duration <= {DOWNLOAD_SETTINGS['max_duration']}"),
+        **_BASE_YDL_OPTS,
     }
 
+    # ⚡ Bolt Optimization: Serve repeat metadata lookups from a TTL cache keyed by video ID
+    # Impact: Re-checking title/duration of the same video (any URL form) skips the full
+    # yt-dlp extraction (~1-3 s of page + player requests) while the entry is fresh.
+    # Measurement: Time two consecutive get_video_info calls for the same video.
+    key = _youtube_video_id(url) or url
+    ttl = DOWNLOAD_SETTINGS.get("info_cache_ttl", 1800)
+    with _METADATA_CACHE_LOCK:
+        cached = _METADATA_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[1] < ttl:
+        return dict(cached[0])
+
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
 
-        return {
+        trimmed = {
             "title": info.get("title", "Unknown"),
             "duration": info.get("duration", 0),
             "uploader": info.get("uploader", "Unknown"),
@@ -201,6 +395,12 @@ def get_video_info(url: str) -> dict:
     except Exception as e:
         raise Exception(f"yt-dlp error: {str(e)[:500]}")
 
+    with _METADATA_CACHE_LOCK:
+        # Same as the raw info cache: evict on insert so a long-running bot stays bounded
+        _prune_metadata(ttl)
+        _METADATA_CACHE[key] = (trimmed, time.monotonic())
+    return dict(trimmed)
+
 
 def _seconds_to_hhmmss(seconds: float) -> str:
     """Convert seconds to HH:MM:SS format"""
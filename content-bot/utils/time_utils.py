@@ -2,6 +2,36 @@
 Utility functions for time formatting.
 """
 
+# ⚡ Bolt Optimization: Use divmod over sequential floor division/modulo arithmetic
+# Impact: Replaces floating point arithmetic and repeated sequential operations with efficient integer `divmod` math.
+# Yields a measurable speedup per call (~5-15%), which aggregates as thousands of timestamps are formatted per video.
+def _format_srt(seconds: float) -> str:
+    """HH:MM:SS,mmm, rounded to the nearest millisecond."""
+    mins, millis = divmod(int(seconds * 1000 + 0.5), 60000)
+    hours, minutes = divmod(mins, 60)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def _format_ass(seconds: float) -> str:
+    """H:MM:SS.cc, rounded to the nearest centisecond."""
+    mins, cs = divmod(int(seconds * 100 + 0.5), 6000)
+    hours, minutes = divmod(mins, 60)
+    secs, centiseconds = divmod(cs, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+_FORMATTERS = {'srt': _format_srt, 'ass': _format_ass}
+
+
+def _get_formatter(format_type: str):
+    """Return the formatter for 'srt' or 'ass'; ValueError for anything else."""
+    try:
+        return _FORMATTERS[format_type]
+    except KeyError:
+        raise ValueError(f"Unknown format type: {format_type}") from None
+
+
 def format_timestamp(seconds: float, format_type: str = 'srt') -> str:
     """
     Convert seconds to timestamp string.
@@ -16,22 +46,23 @@ def format_timestamp(seconds: float, format_type: str = 'srt') -> str:
     Note:
         Uses rounding to nearest millisecond/centisecond.
     """
-    # ⚡ Bolt Optimization: Use divmod over sequential floor division/modulo arithmetic
-    # Impact: Replaces floating point arithmetic and repeated sequential operations with efficient integer `divmod` math.
-    # Yields a measurable speedup per call (~5-15%), which aggregates as thousands of timestamps are formatted per video.
-    if format_type == 'srt':
-        total_millis = int(seconds * 1000 + 0.5)
-        mins, millis = divmod(total_millis, 60000)
-        hours, minutes = divmod(mins, 60)
-        secs, millis = divmod(millis, 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
-    elif format_type == 'ass':
-        total_cs = int(seconds * 100 + 0.5)
-        mins, cs = divmod(total_cs, 6000)
-        hours, minutes = divmod(mins, 60)
-        secs, centiseconds = divmod(cs, 100)
-        return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
-
-    else:
-        raise ValueError(f"Unknown format type: {format_type}")
+    return _get_formatter(format_type)(seconds)
+
+
+def format_timestamp_batch(values, format_type: str = 'srt') -> list:
+    """
+    Convert many second values to timestamp strings at once.
+    Output is identical to calling format_timestamp on each value.
+
+    Args:
+        values (iterable of float): Times in seconds.
+        format_type (str): Format type ('srt' or 'ass').
+
+    Returns:
+        list: Formatted timestamp strings, same order as values.
+    """
+    # ⚡ Bolt Optimization: Format a whole run of timestamps in one call
+    # Impact: Dispatches on format_type once per batch instead of once per timestamp;
+    # both paths share the per-format helpers, so their output cannot drift apart.
+    fmt = _get_formatter(format_type)
+    return [fmt(seconds) for seconds in values]